@@ -26,6 +26,7 @@ class AnsibleCommandModel:
         'become': fields.Boolean,
         'become_method': fields.String,
         'become_user': fields.String,
+        'shards': fields.Integer,
     }
 
 @swagger.model
@@ -42,6 +43,7 @@ class AnsiblePlaybookModel:
         'verbose_level': fields.Integer,
         'become': fields.Boolean,
         'update_git_repo': fields.Boolean,
+        'shards': fields.Integer,
     }
 
 
@@ -37,6 +37,14 @@ config = SafeConfigParser(
         'playbook_filter': '.yml',
         'playbook_dir_filter': '',
         'max_result_size': 20000,
+        'fact_caching': 'jsonfile',
+        'fact_caching_connection': '/tmp/flansible_facts',
+        'fact_caching_timeout': 86400,
+        'fact_refresh_interval': 300,
+        'fact_refresh_redis_url': '',
+        'ssh_control_persist': '60s',
+        'ssh_control_path_root': '~/.flansible/ssh',
+        'ssh_pipelining': 'false',
     }
 )
 
@@ -45,11 +53,21 @@ config.read('config.ini')
 ansible_config = SafeConfigParser()
 
 try:
-    ansible_config.read('/etc/ansible/ansible.cfg')
     ansible_default_inventory = config.get("Default", "inventory")
 except:
     ansible_default_inventory = '/etc/ansible/hosts'
 
+try:
+    # every ansible.cfg Ansible might pick up, lowest precedence first
+    ansible_config.read([
+        '/etc/ansible/ansible.cfg',
+        os.path.expanduser('~/.ansible.cfg'),
+        os.path.join(config.get("Default", "ansible_project_dir"), 'ansible.cfg'),
+        os.environ.get('ANSIBLE_CONFIG', ''),
+    ])
+except:
+    pass
+
 app.config['broker_url'] = config.get("Default", "CELERY_BROKER_URL")
 app.config['result_backend'] = config.get("Default", "CELERY_RESULT_BACKEND")
 str_task_timeout = config.get("Default", "CELERY_TASK_TIMEOUT")
@@ -59,6 +77,31 @@ playbook_filter = config.get("Default", "playbook_filter")
 playbook_dir_filter = config.get("Default", "playbook_dir_filter")
 global_meta = config.get("Default", "global_meta")
 task_timeout = int(str_task_timeout)
+fact_caching = config.get("Default", "fact_caching")
+fact_caching_connection = config.get("Default", "fact_caching_connection")
+fact_caching_timeout = int(config.get("Default", "fact_caching_timeout"))
+fact_refresh_interval = int(config.get("Default", "fact_refresh_interval"))
+fact_refresh_redis_url = config.get("Default", "fact_refresh_redis_url")
+
+SUPPORTED_FACT_CACHING = ('jsonfile', 'redis')
+if fact_caching not in SUPPORTED_FACT_CACHING:
+    raise ValueError(str.format("Unsupported fact_caching '{0}' in config.ini, use one of: {1}",
+                                fact_caching, ", ".join(SUPPORTED_FACT_CACHING)))
+
+# the facts endpoint keeps track of running setup jobs in redis, the celery backends are used if they are redis
+REDIS_URL_SCHEMES = ('redis://', 'rediss://', 'unix://')
+if fact_refresh_redis_url:
+    if not fact_refresh_redis_url.startswith(REDIS_URL_SCHEMES):
+        raise ValueError(str.format("fact_refresh_redis_url must be a redis url, got '{0}'", fact_refresh_redis_url))
+elif app.config['result_backend'].startswith(REDIS_URL_SCHEMES):
+    fact_refresh_redis_url = app.config['result_backend']
+elif app.config['broker_url'].startswith(REDIS_URL_SCHEMES):
+    fact_refresh_redis_url = app.config['broker_url']
+else:
+    fact_refresh_redis_url = None
+ssh_control_persist = config.get("Default", "ssh_control_persist")
+ssh_control_path_root = os.path.expanduser(config.get("Default", "ssh_control_path_root"))
+ssh_pipelining = config.getboolean("Default", "ssh_pipelining")
 
 api = swagger.docs(Api(app), apiVersion='0.1')
 
@@ -85,6 +128,52 @@ def get_inventory_access(username, inventory):
     return result
 
 
+def get_inventory_hosts(host_pattern, inventory):
+    '''
+        Resolve a host pattern against an inventory without contacting the hosts
+    '''
+    output = subprocess.check_output(
+        ['ansible', host_pattern, '-i', inventory, '--list-hosts'],
+        stderr=subprocess.DEVNULL
+    )
+    hosts = []
+    for line in output.decode('utf-8').splitlines():
+        line = line.strip()
+        if line and not line.startswith('hosts ('):
+            hosts.append(line)
+    return hosts
+
+
+def get_playbook_hosts(playbook, inventory, extra_vars=None):
+    '''
+        Resolve the hosts targeted by all plays of a playbook without contacting them.
+        extra_vars are needed for plays with templated hosts, e.g. hosts: "{{ target }}"
+    '''
+    cmd = ['ansible-playbook', playbook, '-i', inventory, '--list-hosts']
+    if extra_vars:
+        cmd += ['--extra-vars', json.dumps(extra_vars)]
+    output = subprocess.check_output(
+        cmd,
+        stderr=subprocess.DEVNULL,
+        cwd=ansible_project_dir
+    )
+    hosts = []
+    seen = set()
+    hosts_indent = None
+    for line in output.decode('utf-8').splitlines():
+        indent = len(line) - len(line.lstrip())
+        line = line.strip()
+        if line.startswith('hosts ('):
+            hosts_indent = indent
+        elif hosts_indent is not None and line and indent > hosts_indent:
+            if line not in seen:
+                seen.add(line)
+                hosts.append(line)
+        else:
+            hosts_indent = None
+    return hosts
+
+
 @auth.verify_password
 def verify_password(username, password):
     result = False
@@ -102,6 +191,8 @@ def verify_password(username, password):
 import flansible.run_ansible_command
 import flansible.run_ansible_playbook
 import flansible.ansible_task_output
+import flansible.ansible_task_output_search
 import flansible.ansible_task_status
+import flansible.ansible_facts
 import flansible.git
 import flansible.list_playbooks
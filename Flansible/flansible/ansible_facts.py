@@ -0,0 +1,104 @@
+import time
+import subprocess
+from flask_restful import Resource, Api
+from flask_restful import reqparse, inputs
+from flask_restful_swagger import swagger
+from flansible import app
+from flansible import api, app, auth, ansible_default_inventory, get_inventory_access, get_inventory_hosts, task_timeout, fact_refresh_interval
+from flansible.flansible_facts import FlansibleFacts
+from flansible import celery_runner
+
+class AnsibleFacts(Resource):
+    @swagger.operation(
+    notes='Get cached facts for the hosts matching a host pattern. A setup job is started for hosts with missing or expired facts',
+    nickname='ansiblefacts',
+    parameters=[
+        {
+        "name": "host_pattern",
+        "description": "The host or host pattern to get facts for",
+        "required": True,
+        "allowMultiple": False,
+        "dataType": 'string',
+        "paramType": "path"
+        },
+        {
+        "name": "inventory",
+        "description": "path to inventory",
+        "required": False,
+        "allowMultiple": False,
+        "dataType": 'string',
+        "paramType": "query"
+        },
+        {
+        "name": "refresh",
+        "description": "Start a setup job for hosts with missing or expired facts. defaults to true",
+        "required": False,
+        "allowMultiple": False,
+        "dataType": 'bool',
+        "paramType": "query"
+        },
+    ])
+    @auth.login_required
+    def get(self, host_pattern):
+        parser = reqparse.RequestParser()
+        parser.add_argument('inventory', type=str, help='path to inventory', required=False, location='args')
+        parser.add_argument('refresh', type=inputs.boolean, help='refresh missing facts', required=False, location='args')
+        args = parser.parse_args()
+        inventory = args['inventory']
+        refresh = args['refresh'] is None or args['refresh']
+        curr_user = auth.username()
+
+        if not inventory:
+            inventory = ansible_default_inventory
+        has_inv_access = get_inventory_access(curr_user, inventory)
+        if not has_inv_access:
+            resp = app.make_response((str.format("User does not have access to inventory {0}", inventory), 403))
+            return resp
+
+        try:
+            hosts = get_inventory_hosts(host_pattern, inventory)
+        except subprocess.CalledProcessError:
+            resp = app.make_response((str.format("Failed to resolve host pattern {0}", host_pattern), 400))
+            return resp
+        if len(hosts) == 0:
+            resp = app.make_response((str.format("No hosts matched {0}", host_pattern), 404))
+            return resp
+
+        facts = FlansibleFacts.get_cached_facts(hosts)
+        missing = [host for host in hosts if host not in facts]
+
+        # reuse setup jobs that are still running or just finished instead of starting a new
+        # fan-out on every poll, hosts that stay unreachable are retried every fact_refresh_interval
+        task_ids = []
+        if missing and refresh:
+            if not FlansibleFacts.can_track_refresh():
+                resp = app.make_response(("Refreshing facts needs a redis server, set fact_refresh_redis_url in config.ini", 501))
+                return resp
+            now = time.time()
+            refresh_tasks = FlansibleFacts.get_refresh_tasks(missing)
+            task_ready = {}
+            to_refresh = []
+            for host in missing:
+                refresh_task = refresh_tasks.get(host)
+                if refresh_task is None:
+                    to_refresh.append(host)
+                    continue
+                task_id = refresh_task['task_id']
+                if task_id not in task_ready:
+                    task_ready[task_id] = celery_runner.do_long_running_task.AsyncResult(task_id).ready()
+                if now - refresh_task['started'] < fact_refresh_interval or not task_ready[task_id]:
+                    if task_id not in task_ids:
+                        task_ids.append(task_id)
+                else:
+                    to_refresh.append(host)
+
+            if to_refresh:
+                command = str.format("ansible {0} -m setup -i {1}", ",".join(to_refresh), inventory)
+                task_result = celery_runner.do_long_running_task.apply_async([command], soft=task_timeout, hard=task_timeout)
+                FlansibleFacts.set_refresh_task(to_refresh, task_result.id)
+                task_ids.append(task_result.id)
+
+        result = {'facts': facts, 'missing': missing, 'task_ids': task_ids}
+        return result
+
+api.add_resource(AnsibleFacts, '/api/ansiblefacts/<string:host_pattern>')
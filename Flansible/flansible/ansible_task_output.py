@@ -3,7 +3,8 @@ from flask_restful_swagger import swagger
 from flansible import app
 from flansible import api, app, celery, auth
 from flansible.ModelClasses import AnsibleCommandModel, AnsiblePlaybookModel, AnsibleRequestResultModel, AnsibleExtraArgsModel
-import flansible.celery_runner
+from flansible import celery_runner
+from flansible.flansible_shards import FlansibleShards
 
 class AnsibleTaskOutput(Resource):
     @swagger.operation(
@@ -21,6 +22,12 @@ class AnsibleTaskOutput(Resource):
     ])
     @auth.login_required
     def get(self, task_id):
+        group_result = FlansibleShards.restore(task_id)
+        if group_result is not None:
+            resp = app.make_response((FlansibleShards.get_output(group_result), 200))
+            resp.headers['content-type'] = 'text/plain'
+            return resp
+
         task = celery_runner.do_long_running_task.AsyncResult(task_id)
         if task.state == 'PENDING':
             result = "Task not found"
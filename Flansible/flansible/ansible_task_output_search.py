@@ -0,0 +1,278 @@
+import re
+import time
+import multiprocessing
+from collections import deque
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
+from flask_restful import Resource, Api
+from flask_restful import reqparse, inputs
+from flask_restful_swagger import swagger
+from flansible import app
+from flansible import api, app, celery, auth
+from flansible import celery_runner
+from flansible.flansible_shards import FlansibleShards
+
+# re has no timeout, so user supplied regexes are matched in a child process that is killed after SEARCH_TIMEOUT
+MAX_PATTERN_LENGTH = 200
+# keep the response small, it's the whole point of searching server-side
+MAX_CONTEXT = 50
+MAX_MATCHES = 1000
+SEARCH_TIMEOUT = 5
+REPEAT_OPS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+
+def iter_lines(output):
+    '''
+        Yield (line number, offset, line) for each line of output without splitting it up front
+    '''
+    lineno = 1
+    offset = 0
+    length = len(output)
+    while offset < length:
+        end = output.find('\n', offset)
+        if end == -1:
+            end = length
+        yield lineno, offset, output[offset:end]
+        lineno += 1
+        offset = end + 1
+
+
+def _subpatterns(value):
+    if isinstance(value, sre_parse.SubPattern):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            for subpattern in _subpatterns(item):
+                yield subpattern
+
+
+def has_nested_quantifier(items, in_repeat=False):
+    '''
+        True if a repeated part of the parsed pattern contains another repeat, like (a+)+,
+        which can make the regex engine backtrack catastrophically
+    '''
+    for op, av in items:
+        if op in REPEAT_OPS:
+            repeat_min, repeat_max, subpattern = av
+            if repeat_max > 1:
+                if in_repeat:
+                    return True
+                if has_nested_quantifier(subpattern, True):
+                    return True
+                continue
+        for subpattern in _subpatterns(av):
+            if has_nested_quantifier(subpattern, in_repeat):
+                return True
+    return False
+
+
+def search_output(output, matcher, context, max_matches, timeout=SEARCH_TIMEOUT):
+    '''
+        Returns the blocks of lines matching matcher, with context lines around them.
+        Overlapping and adjacent blocks are merged, like grep -C does
+    '''
+    blocks = []
+    before = deque(maxlen=context)
+    current = None
+    after_remaining = 0
+    match_count = 0
+    truncated = False
+    timed_out = False
+    deadline = time.time() + timeout
+
+    for lineno, offset, line in iter_lines(output):
+        if time.time() > deadline:
+            truncated = True
+            timed_out = True
+            break
+        if matcher(line):
+            if match_count >= max_matches:
+                truncated = True
+                break
+            match_count += 1
+            if current is None:
+                current = list(before)
+                before.clear()
+            current.append((lineno, offset, line))
+            after_remaining = context
+        elif current is not None and after_remaining > 0:
+            current.append((lineno, offset, line))
+            after_remaining -= 1
+        else:
+            if current is not None:
+                blocks.append(current)
+                current = None
+            if context > 0:
+                before.append((lineno, offset, line))
+
+    if current is not None:
+        blocks.append(current)
+
+    result_blocks = []
+    for block in blocks:
+        first = block[0]
+        last = block[-1]
+        lines = [item[2] for item in block]
+        if result_blocks and result_blocks[-1]['end_line'] + 1 == first[0]:
+            result_blocks[-1]['end_line'] = last[0]
+            result_blocks[-1]['lines'].extend(lines)
+        else:
+            result_blocks.append({'start_line': first[0],
+                                  'end_line': last[0],
+                                  'offset': first[1],
+                                  'lines': lines})
+    return {'matches': result_blocks, 'match_count': match_count, 'truncated': truncated, 'timed_out': timed_out}
+
+
+def search_output_killable(output, matcher, context, max_matches, timeout=SEARCH_TIMEOUT):
+    '''
+        Runs search_output in a forked child process, so a regex that backtracks catastrophically
+        on a single line can be killed. Returns None if the child had to be killed
+    '''
+    fork_context = multiprocessing.get_context('fork')
+    receiver, sender = fork_context.Pipe(duplex=False)
+
+    def run():
+        # the forked child shares output with the web process, only the matches are sent back
+        sender.send(search_output(output, matcher, context, max_matches, timeout))
+        sender.close()
+
+    proc = fork_context.Process(target=run)
+    proc.start()
+    sender.close()
+    result = None
+    try:
+        if receiver.poll(timeout + 1):
+            result = receiver.recv()
+    except EOFError:
+        pass
+    finally:
+        receiver.close()
+        if proc.is_alive():
+            proc.terminate()
+        proc.join()
+    return result
+
+
+class AnsibleTaskOutputSearch(Resource):
+    @swagger.operation(
+    notes='Search the output of an Ansible task/job, returning only the matching lines',
+    nickname='ansibletaskoutputsearch',
+    parameters=[
+        {
+        "name": "task_id",
+        "description": "The ID of the task/job to search the output of",
+        "required": True,
+        "allowMultiple": False,
+        "dataType": 'string',
+        "paramType": "path"
+        },
+        {
+        "name": "pattern",
+        "description": "substring (or regular expression, see regex) to search for",
+        "required": True,
+        "allowMultiple": False,
+        "dataType": 'string',
+        "paramType": "query"
+        },
+        {
+        "name": "regex",
+        "description": "treat pattern as a regular expression. defaults to false",
+        "required": False,
+        "allowMultiple": False,
+        "dataType": 'bool',
+        "paramType": "query"
+        },
+        {
+        "name": "ignore_case",
+        "description": "case insensitive search. defaults to false",
+        "required": False,
+        "allowMultiple": False,
+        "dataType": 'bool',
+        "paramType": "query"
+        },
+        {
+        "name": "context",
+        "description": "number of lines to include before and after each match, max 50. defaults to 0",
+        "required": False,
+        "allowMultiple": False,
+        "dataType": 'integer',
+        "paramType": "query"
+        },
+        {
+        "name": "max_matches",
+        "description": "stop after this many matching lines, max 1000. defaults to 100",
+        "required": False,
+        "allowMultiple": False,
+        "dataType": 'integer',
+        "paramType": "query"
+        },
+    ])
+    @auth.login_required
+    def get(self, task_id):
+        parser = reqparse.RequestParser()
+        parser.add_argument('pattern', type=str, help='need to specify pattern', required=True, location='args')
+        parser.add_argument('regex', type=inputs.boolean, help='regex', required=False, location='args')
+        parser.add_argument('ignore_case', type=inputs.boolean, help='ignore case', required=False, location='args')
+        parser.add_argument('context', type=inputs.natural, help='context lines', required=False, location='args')
+        parser.add_argument('max_matches', type=inputs.positive, help='max matches', required=False, location='args')
+        args = parser.parse_args()
+        pattern = args['pattern']
+        context = args['context']
+        max_matches = args['max_matches']
+
+        if not context:
+            context = 0
+        if not max_matches:
+            max_matches = 100
+
+        if context > MAX_CONTEXT:
+            resp = app.make_response((str.format("Context too large, max {0} lines", MAX_CONTEXT), 400))
+            return resp
+        if max_matches > MAX_MATCHES:
+            resp = app.make_response((str.format("max_matches too large, max {0}", MAX_MATCHES), 400))
+            return resp
+        if len(pattern) > MAX_PATTERN_LENGTH:
+            resp = app.make_response((str.format("Pattern too long, max {0} characters", MAX_PATTERN_LENGTH), 400))
+            return resp
+
+        flags = re.IGNORECASE if args['ignore_case'] else 0
+        if not args['regex']:
+            pattern = re.escape(pattern)
+        try:
+            if args['regex'] and has_nested_quantifier(sre_parse.parse(pattern, flags)):
+                resp = app.make_response(("Nested quantifiers like (a+)+ are not allowed", 400))
+                return resp
+            matcher = re.compile(pattern, flags).search
+        except re.error as e:
+            resp = app.make_response((str.format("Invalid regular expression: {0}", e), 400))
+            return resp
+
+        group_result = FlansibleShards.restore(task_id)
+        if group_result is not None:
+            output = FlansibleShards.get_output(group_result)
+        else:
+            task = celery_runner.do_long_running_task.AsyncResult(task_id)
+            if task.state == 'PENDING':
+                result = "Task not found"
+                resp = app.make_response((result, 404))
+                return resp
+            if not isinstance(task.info, dict):
+                # FAILURE, e.g. killed by the time limit: info is the exception and there is no output
+                resp = app.make_response((str.format("Task has no output to search, state {0}: {1}", task.state, task.info), 409))
+                return resp
+            output = task.info['output']
+
+        if not args['regex']:
+            # an escaped literal can't backtrack, no need to fork
+            return search_output(output, matcher, context, max_matches)
+
+        result = search_output_killable(output, matcher, context, max_matches)
+        if result is None:
+            resp = app.make_response((str.format("Search did not finish within {0} seconds, try a simpler pattern", SEARCH_TIMEOUT), 400))
+            return resp
+        return result
+
+api.add_resource(AnsibleTaskOutputSearch, '/api/ansibletaskoutput/<string:task_id>/search')
@@ -1,7 +1,33 @@
+import os
 from celery import Celery
+from celery.signals import celeryd_after_setup, worker_shutdown
+from celery.exceptions import WorkerShutdown
 import subprocess
 from subprocess import Popen, PIPE
 from flansible import api, app, celery, task_timeout
+from flansible.flansible_facts import FlansibleFacts
+from flansible.flansible_ssh import FlansibleSsh
+
+
+@celeryd_after_setup.connect
+def setup_ssh_control_path(sender, instance, **kwargs):
+    try:
+        FlansibleSsh.setup_worker(sender)
+    except RuntimeError as e:
+        # signal receivers' exceptions are only logged, so stop the worker explicitly
+        raise WorkerShutdown(str(e))
+
+
+@worker_shutdown.connect
+def cleanup_ssh_control_path(sender, **kwargs):
+    FlansibleSsh.cleanup_worker()
+
+
+def ansible_environment():
+    env = os.environ.copy()
+    env.update(FlansibleFacts.ansible_env())
+    env.update(FlansibleSsh.ansible_env())
+    return env
 
 
 @celery.task(bind=True, soft_time_limit=task_timeout, time_limit=(task_timeout+10))
@@ -16,7 +42,7 @@ def do_long_running_task(self, cmd, type='Ansible'):
                                 'description': "",
                                 'returncode': None})
         print(str.format("About to execute: {0}", cmd))
-        proc = Popen([cmd], stdout=PIPE, stderr=subprocess.STDOUT, shell=True)
+        proc = Popen([cmd], stdout=PIPE, stderr=subprocess.STDOUT, shell=True, env=ansible_environment())
         for line in iter(proc.stdout.readline, ''):
             #print(line.decode('utf-8'))
             output = output + line.decode('utf-8')
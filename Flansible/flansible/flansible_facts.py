@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import redis
+from flansible import fact_caching, fact_caching_connection, fact_caching_timeout, fact_refresh_interval, fact_refresh_redis_url, task_timeout
+
+
+def _redis_connection_kwargs(connection_string):
+    # same "host:port:db:password" format as Ansible's redis cache plugin
+    connection = connection_string.split(':')
+    kwargs = {}
+    if len(connection) > 0 and connection[0]:
+        kwargs['host'] = connection[0]
+    if len(connection) > 1 and connection[1]:
+        kwargs['port'] = int(connection[1])
+    if len(connection) > 2 and connection[2]:
+        kwargs['db'] = int(connection[2])
+    if len(connection) > 3 and connection[3]:
+        kwargs['password'] = connection[3]
+    return kwargs
+
+if fact_caching == 'redis':
+    redis_cache_kwargs = _redis_connection_kwargs(fact_caching_connection)
+else:
+    redis_cache_kwargs = None
+
+REFRESH_KEY_PREFIX = 'flansible_facts_refresh'
+
+class FlansibleFacts:
+    @staticmethod
+    def ansible_env():
+        '''
+            Environment variables pointing Ansible at the Flansible-managed fact cache
+        '''
+        return {
+            'ANSIBLE_CACHE_PLUGIN': fact_caching,
+            'ANSIBLE_CACHE_PLUGIN_CONNECTION': fact_caching_connection,
+            'ANSIBLE_CACHE_PLUGIN_TIMEOUT': str(fact_caching_timeout),
+        }
+
+    @staticmethod
+    def get_cached_facts(hosts):
+        '''
+            Returns a dict of host: facts for the hosts that have facts in the cache.
+            Hosts with missing or expired facts are left out
+        '''
+        if fact_caching == 'redis':
+            return FlansibleFacts._get_redis_facts(hosts)
+        elif fact_caching == 'jsonfile':
+            return FlansibleFacts._get_jsonfile_facts(hosts)
+
+    @staticmethod
+    def _get_jsonfile_facts(hosts):
+        facts = {}
+        now = time.time()
+        for host in hosts:
+            cache_file = os.path.join(fact_caching_connection, host)
+            try:
+                if fact_caching_timeout != 0 and now - os.path.getmtime(cache_file) > fact_caching_timeout:
+                    continue
+                with open(cache_file) as facts_file:
+                    facts[host] = json.load(facts_file)
+            except (OSError, ValueError):
+                continue
+        return facts
+
+    @staticmethod
+    def _get_redis_facts(hosts):
+        cache = redis.StrictRedis(**redis_cache_kwargs)
+        # Ansible stores keys with setex, so expired facts are already gone
+        values = cache.mget(['ansible_facts' + host for host in hosts])
+        facts = {}
+        for host, value in zip(hosts, values):
+            if value is not None:
+                facts[host] = json.loads(value.decode('utf-8'))
+        return facts
+
+    @staticmethod
+    def can_track_refresh():
+        return fact_refresh_redis_url is not None
+
+    @staticmethod
+    def get_refresh_tasks(hosts):
+        '''
+            Returns a dict of host: {'task_id', 'started'} for the hosts a setup job was recently started for
+        '''
+        client = redis.StrictRedis.from_url(fact_refresh_redis_url)
+        values = client.mget([REFRESH_KEY_PREFIX + host for host in hosts])
+        refresh_tasks = {}
+        for host, value in zip(hosts, values):
+            if value is not None:
+                refresh_tasks[host] = json.loads(value.decode('utf-8'))
+        return refresh_tasks
+
+    @staticmethod
+    def set_refresh_task(hosts, task_id):
+        client = redis.StrictRedis.from_url(fact_refresh_redis_url)
+        value = json.dumps({'task_id': task_id, 'started': time.time()})
+        pipe = client.pipeline()
+        for host in hosts:
+            # no setup job outlives task_timeout, so the key doesn't need to either
+            pipe.setex(REFRESH_KEY_PREFIX + host, task_timeout + fact_refresh_interval, value)
+        pipe.execute()
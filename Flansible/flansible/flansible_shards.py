@@ -0,0 +1,77 @@
+from celery import group
+from celery.result import GroupResult
+from flansible import celery
+from flansible import celery_runner
+
+class FlansibleShards:
+    @staticmethod
+    def split_hosts(hosts, shards):
+        '''
+            Split hosts into at most shards non-empty, evenly sized slices
+        '''
+        return [hosts[i::shards] for i in range(min(shards, len(hosts)))]
+
+    @staticmethod
+    def run_sharded(command, hosts, shards):
+        '''
+            Run command once per host slice, limited to that slice, as a celery group
+        '''
+        signatures = []
+        for shard_hosts in FlansibleShards.split_hosts(hosts, shards):
+            limit_string = str.format(" --limit '{0}'", ",".join(shard_hosts))
+            signatures.append(celery_runner.do_long_running_task.s(command + limit_string))
+        group_result = group(signatures).apply_async()
+        # persist the group so status/output can find the shards by the parent id
+        group_result.save()
+        return group_result
+
+    @staticmethod
+    def restore(task_id):
+        return GroupResult.restore(task_id, app=celery)
+
+    @staticmethod
+    def get_status(group_result):
+        running = 0
+        failed = []
+        crashed = []
+        for index, shard in enumerate(group_result.results):
+            if shard.state == 'PENDING' or shard.state == 'PROGRESS':
+                running += 1
+            else:
+                try:
+                    if shard.info['returncode'] != 0:
+                        failed.append(shard.info)
+                except (TypeError, KeyError):
+                    # e.g. killed by the time limit, info is the exception
+                    crashed.append(str.format("shard {0} [{1}]: {2}", index + 1, shard.id, shard.info))
+
+        shard_count = len(group_result.results)
+        if running:
+            result_obj = {'Status': "PROGRESS",
+                          'description': str.format("{0} of {1} shards finished", shard_count - running, shard_count),
+                          'returncode': None}
+        elif crashed:
+            result_obj = {'Status': "CELERY_FAILURE",
+                          'description': str.format("{0} of {1} shards crashed: {2}", len(crashed), shard_count, "; ".join(crashed))}
+        elif failed:
+            result_obj = {'Status': "FLANSIBLE_TASK_FAILURE",
+                          'description': str.format("{0} of {1} shards reported error", len(failed), shard_count),
+                          'returncode': failed[0]['returncode']}
+        else:
+            result_obj = {'Status': "SUCCESS",
+                          'description': str.format("All {0} shards finished", shard_count)}
+        return result_obj
+
+    @staticmethod
+    def get_output(group_result):
+        shard_count = len(group_result.results)
+        output = ""
+        for index, shard in enumerate(group_result.results):
+            output += str.format("==== shard {0}/{1} [{2}] ====\n", index + 1, shard_count, shard.id)
+            if shard.state == 'PENDING':
+                output += "waiting for worker\n"
+            elif isinstance(shard.info, dict):
+                output += shard.info['output']
+            else:
+                output += str.format("{0}\n", shard.info)
+        return output
@@ -0,0 +1,81 @@
+import os
+import re
+import stat
+import shutil
+import subprocess
+from flansible import ansible_config, ssh_control_persist, ssh_control_path_root, ssh_pipelining
+
+class FlansibleSsh:
+    # set once per worker node before the pool forks, inherited by the pool processes
+    control_path_dir = None
+
+    @staticmethod
+    def setup_worker(nodename):
+        '''
+            Create the ControlMaster socket directory for this worker node.
+            Raises RuntimeError if an existing directory isn't private to this user
+        '''
+        if not FlansibleSsh.control_persist_enabled():
+            return
+        worker_dir = re.sub(r'[^A-Za-z0-9_.-]', '_', nodename)
+        control_path_dir = os.path.join(ssh_control_path_root, worker_dir)
+        for path in (ssh_control_path_root, control_path_dir):
+            if not os.path.lexists(path):
+                os.makedirs(path, mode=0o700)
+            FlansibleSsh._check_private_dir(path)
+        FlansibleSsh.control_path_dir = control_path_dir
+
+    @staticmethod
+    def _check_private_dir(path):
+        # anyone who can write here could plant sockets our ssh connections would be multiplexed over
+        st = os.lstat(path)
+        if not stat.S_ISDIR(st.st_mode):
+            raise RuntimeError(str.format("SSH control path {0} is not a directory", path))
+        if st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) != 0o700:
+            raise RuntimeError(str.format("SSH control path {0} must be owned by uid {1} with mode 0700", path, os.getuid()))
+
+    @staticmethod
+    def cleanup_worker():
+        '''
+            Close the persisted master connections and remove the socket directory
+        '''
+        control_path_dir = FlansibleSsh.control_path_dir
+        if control_path_dir is None or not os.path.isdir(control_path_dir):
+            return
+        for name in os.listdir(control_path_dir):
+            control_path = os.path.join(control_path_dir, name)
+            subprocess.call(['ssh', '-O', 'exit', '-o', str.format('ControlPath={0}', control_path), 'flansible'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(control_path_dir, ignore_errors=True)
+        FlansibleSsh.control_path_dir = None
+
+    @staticmethod
+    def control_persist_enabled():
+        return ssh_control_persist.lower() not in ('', '0', 'no', 'false')
+
+    @staticmethod
+    def ansible_env():
+        '''
+            Environment variables making Ansible reuse SSH connections between tasks on this worker
+        '''
+        env = {}
+        if ssh_pipelining:
+            env['ANSIBLE_PIPELINING'] = 'True'
+            env['ANSIBLE_SSH_PIPELINING'] = 'True'
+        if FlansibleSsh.control_persist_enabled():
+            if FlansibleSsh.control_path_dir is not None:
+                env['ANSIBLE_SSH_CONTROL_PATH_DIR'] = FlansibleSsh.control_path_dir
+            if not FlansibleSsh.ssh_args_configured():
+                env['ANSIBLE_SSH_ARGS'] = str.format('-C -o ControlMaster=auto -o ControlPersist={0}', ssh_control_persist)
+        elif not FlansibleSsh.ssh_args_configured():
+            # Ansible's own default ssh_args would still persist connections in ~/.ansible/cp
+            env['ANSIBLE_SSH_ARGS'] = '-C -o ControlMaster=no'
+        return env
+
+    @staticmethod
+    def ssh_args_configured():
+        '''
+            True if ssh_args are set in the environment or an ansible.cfg, those are never overridden
+        '''
+        return 'ANSIBLE_SSH_ARGS' in os.environ or \
+            ansible_config.has_option('ssh_connection', 'ssh_args')
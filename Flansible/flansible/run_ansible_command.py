@@ -1,11 +1,13 @@
 import os
+import subprocess
 from flask_restful import Resource, Api
 from flask_restful_swagger import swagger
 from flask_restful import reqparse
 from flansible import app
-from flansible import api, app, auth, ansible_default_inventory, get_inventory_access, task_timeout
+from flansible import api, app, auth, ansible_default_inventory, get_inventory_access, get_inventory_hosts, task_timeout
 from flansible.ModelClasses import AnsibleCommandModel, AnsiblePlaybookModel, AnsibleRequestResultModel, AnsibleExtraArgsModel
-import flansible.celery_runner
+from flansible import celery_runner
+from flansible.flansible_shards import FlansibleShards
 
 class RunAnsibleCommand(Resource):
     @swagger.operation(
@@ -46,6 +48,7 @@ class RunAnsibleCommand(Resource):
         parser.add_argument('become', type=bool, help='run with become', required=False)
         parser.add_argument('become_method', type=str, help='become method', required=False)
         parser.add_argument('become_user', type=str, help='become user', required=False)
+        parser.add_argument('shards', type=int, help='split the hosts into this many parallel tasks', required=False)
         args = parser.parse_args()
         host_pattern = args['host_pattern']
         req_module = args['module']
@@ -57,6 +60,7 @@ class RunAnsibleCommand(Resource):
         become = args['become']
         become_method = args['become_method']
         become_user = args['become_user']
+        shards = args['shards']
         module_args_string = ''
         extra_vars_string = ''
         curr_user = auth.username()
@@ -94,6 +98,7 @@ class RunAnsibleCommand(Resource):
                 resp = app.make_response((str.format("User does not have access to inventory {0}", inventory), 403))
                 return resp
 
+        inventory_path = inventory
         inventory = str.format(" -i {0}", inventory)
         if forks:
             fork_string = str.format('-f {0}', str(forks))
@@ -127,6 +132,19 @@ class RunAnsibleCommand(Resource):
 
         command = str.format("ansible {9} -m {0} {1} {2} {3}{4}{5}{6}{7}{8}", req_module, module_args_string, fork_string, verb_string, 
                              become_string, become_method_string, become_user_string, inventory, extra_vars_string ,host_pattern)
+        if shards and shards > 1:
+            try:
+                hosts = get_inventory_hosts(host_pattern, inventory_path)
+            except subprocess.CalledProcessError:
+                resp = app.make_response((str.format("Failed to resolve host pattern {0}", host_pattern), 400))
+                return resp
+            if len(hosts) == 0:
+                resp = app.make_response((str.format("No hosts matched {0}", host_pattern), 404))
+                return resp
+            group_result = FlansibleShards.run_sharded(command, hosts, shards)
+            result = {'task_id': group_result.id, 'shards': len(group_result.results)}
+            return result
+
         task_result = celery_runner.do_long_running_task.apply_async([command], soft=task_timeout, hard=task_timeout)
         result = {'task_id': task_result.id}
         return result
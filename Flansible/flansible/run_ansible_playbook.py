@@ -1,12 +1,14 @@
 import os
+import subprocess
 from flask_restful import Resource, Api
 from flask_restful_swagger import swagger
 from flask_restful import reqparse
 from flansible import app, ansible_project_dir
-from flansible import api, app, celery, auth, ansible_default_inventory, get_inventory_access, task_timeout
+from flansible import api, app, celery, auth, ansible_default_inventory, get_inventory_access, get_playbook_hosts, task_timeout
 from flansible.ModelClasses import AnsibleCommandModel, AnsiblePlaybookModel, AnsibleRequestResultModel, AnsibleExtraArgsModel
 from flansible import celery_runner
 from flansible.flansible_git import FlansibleGit
+from flansible.flansible_shards import FlansibleShards
 import json
 
 class RunAnsiblePlaybook(Resource):
@@ -50,6 +52,7 @@ class RunAnsiblePlaybook(Resource):
         parser.add_argument('update_git_repo', type=bool,
                             help='Set to true to update git repo prior to executing',
                             required=False)
+        parser.add_argument('shards', type=int, help='split the hosts into this many parallel tasks', required=False)
         args = parser.parse_args()
 
         playbook_dir = args['playbook_dir']
@@ -58,6 +61,7 @@ class RunAnsiblePlaybook(Resource):
         inventory = args['inventory']
         extra_vars = args['extra_vars']
         do_update_git_repo = args['update_git_repo']
+        shards = args['shards']
 
         if do_update_git_repo is True:
             result = FlansibleGit.update_git_repo(playbook_dir)
@@ -97,6 +101,7 @@ class RunAnsiblePlaybook(Resource):
                 resp = app.make_response((str.format("Inventory path not found: {0}", inventory), 404))
                 return resp
 
+        inventory_path = inventory
         inventory = str.format(" -i {0}", inventory)
 
         if become:
@@ -110,6 +115,19 @@ class RunAnsiblePlaybook(Resource):
             extra_vars_string = " --extra-vars '%s'" % (json.dumps(extra_vars).replace("'", "'\\''"))
 
         command = str.format("cd {0};ansible-playbook {1}{2}{3}{4}", ansible_project_dir, playbook_full_path, become_string, inventory, extra_vars_string)
+        if shards and shards > 1:
+            try:
+                hosts = get_playbook_hosts(playbook_full_path, inventory_path, extra_vars)
+            except subprocess.CalledProcessError:
+                resp = app.make_response((str.format("Failed to list hosts for playbook {0}", playbook_full_path), 400))
+                return resp
+            if len(hosts) == 0:
+                resp = app.make_response((str.format("No hosts matched by playbook {0}", playbook_full_path), 404))
+                return resp
+            group_result = FlansibleShards.run_sharded(command, hosts, shards)
+            result = {'task_id': group_result.id, 'shards': len(group_result.results)}
+            return result
+
         task_result = celery_runner.do_long_running_task.apply_async([command], soft=task_timeout, hard=task_timeout)
         result = {'task_id': task_result.id}
         return result